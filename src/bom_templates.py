@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import Callable, List, Dict
 
 # BOM templates for different assemblies
 # Hierarchical structure: Level 0 = Main Assembly, Level 1 = Sub-assembly, Level 2 = Part
@@ -136,21 +136,38 @@ def default_wood_shelf_bom() -> List[Dict[str, object]]:
     return items
 
 
-def choose_bom_from_filename(name: str) -> List[Dict[str, object]]:
+# Template registry keyed by the name used in price catalog part keys.
+TEMPLATES: Dict[str, Callable[[], List[Dict[str, object]]]] = {
+    "engine": engine_assembly_bom,
+    "transmission": transmission_assembly_bom,
+    "suspension": suspension_assembly_bom,
+    "exhaust": exhaust_assembly_bom,
+    "cooling": cooling_assembly_bom,
+    "wood_table": default_wood_table_bom,
+    "wood_chair": default_wood_chair_bom,
+    "wood_shelf": default_wood_shelf_bom,
+}
+
+
+def template_name_from_filename(name: str) -> str:
     lower = name.lower()
     if "engine" in lower or "motor" in lower:
-        return engine_assembly_bom()
+        return "engine"
     if "transmission" in lower or "gearbox" in lower:
-        return transmission_assembly_bom()
+        return "transmission"
     if "suspension" in lower or "strut" in lower:
-        return suspension_assembly_bom()
+        return "suspension"
     if "exhaust" in lower or "muffler" in lower:
-        return exhaust_assembly_bom()
+        return "exhaust"
     if "cooling" in lower or "radiator" in lower:
-        return cooling_assembly_bom()
+        return "cooling"
     if "chair" in lower:
-        return default_wood_chair_bom()
+        return "wood_chair"
     if "shelf" in lower:
-        return default_wood_shelf_bom()
+        return "wood_shelf"
     # default to table
-    return default_wood_table_bom()
+    return "wood_table"
+
+
+def choose_bom_from_filename(name: str) -> List[Dict[str, object]]:
+    return TEMPLATES[template_name_from_filename(name)]()
@@ -0,0 +1,79 @@
+from collections import defaultdict, deque
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.bom_templates import TEMPLATES
+from src.pricing import apply_prices
+
+# A BOM line for diffing: (assembly, Item No, Part Name, Quantity, Unit Price).
+Line = Tuple[str, str, str, int, float]
+
+DIFF_FIELDS = ["assembly", "Item No", "Part Name", "change", "Old Quantity", "New Quantity", "Old Unit Price", "New Unit Price", "Cost Delta"]
+
+
+def template_lines(assemblies: Iterable[Tuple[str, str, int]], prices: Optional[Dict[str, float]] = None) -> Iterator[Line]:
+    """Lines of the current templates for (assembly, template name, occurrences).
+
+    Each assembly's lines are emitted once per occurrence so they pair up with
+    every stored copy in diff_lines.
+    """
+    for assembly, template, occurrences in assemblies:
+        items = TEMPLATES[template]()
+        if prices is not None:
+            apply_prices(items, template, prices)
+        for _ in range(occurrences):
+            for row in items:
+                yield assembly, str(row["Item No"]), str(row["Part Name"]), int(row["Quantity"]), float(row["Unit Price"])
+
+
+def diff_lines(old: Iterable[Line], new: Iterable[Line]) -> Tuple[List[Dict[str, object]], Dict[str, float]]:
+    """Hash-join two line sets on (assembly, Item No, Part Name).
+
+    Only `old` is held in memory; `new` is streamed once, so the cost is linear
+    in the total number of lines. A key that occurs several times (the same
+    assembly name processed twice in one run) is matched occurrence by
+    occurrence. Returns the changed lines and the cost delta of every assembly
+    whose total changed.
+    """
+    old_index: Dict[Tuple[str, str, str], Deque[Tuple[int, float]]] = defaultdict(deque)
+    totals: Dict[str, float] = defaultdict(float)
+    for assembly, item_no, part_name, qty, price in old:
+        old_index[(assembly, item_no, part_name)].append((qty, price))
+        totals[assembly] -= qty * price
+
+    changes: List[Dict[str, object]] = []
+    for assembly, item_no, part_name, qty, price in new:
+        totals[assembly] += qty * price
+        pending = old_index.get((assembly, item_no, part_name))
+        before = pending.popleft() if pending else None
+        if before is None:
+            changes.append(_change(assembly, item_no, part_name, "added", None, (qty, price)))
+            continue
+        qty_changed = before[0] != qty
+        price_changed = abs(before[1] - price) > 1e-9
+        if qty_changed or price_changed:
+            kind = "quantity+price" if qty_changed and price_changed else "quantity" if qty_changed else "price"
+            changes.append(_change(assembly, item_no, part_name, kind, before, (qty, price)))
+
+    for (assembly, item_no, part_name), pending in old_index.items():
+        for before in pending:
+            changes.append(_change(assembly, item_no, part_name, "removed", before, None))
+
+    deltas = {assembly: delta for assembly, delta in totals.items() if abs(delta) > 1e-9}
+    return changes, deltas
+
+
+def _change(assembly: str, item_no: str, part_name: str, kind: str,
+            before: Optional[Tuple[int, float]], after: Optional[Tuple[int, float]]) -> Dict[str, object]:
+    old_qty, old_price = before if before is not None else (0, 0.0)
+    new_qty, new_price = after if after is not None else (0, 0.0)
+    return {
+        "assembly": assembly,
+        "Item No": item_no,
+        "Part Name": part_name,
+        "change": kind,
+        "Old Quantity": old_qty if before is not None else None,
+        "New Quantity": new_qty if after is not None else None,
+        "Old Unit Price": old_price if before is not None else None,
+        "New Unit Price": new_price if after is not None else None,
+        "Cost Delta": new_qty * new_price - old_qty * old_price,
+    }
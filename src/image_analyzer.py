@@ -1,28 +1,118 @@
-from typing import Tuple
-from PIL import Image
+import math
+import os
+import warnings
+from typing import NamedTuple, Tuple
+from PIL import Image, ImageMode
 import numpy as np
 
 WOOD_HUE_RANGE = (15, 45)  # approx brown/orange hues in HSV (0-180 scale if using OpenCV), here we'll compute simplistic hue-like
 METAL_HUE_RANGE = (180, 240)  # gray/silver/metallic hues
+WOOD_MIN_SAT = 0.2
+WOOD_MIN_VAL = 0.2
+METAL_MAX_SAT = 0.3
+METAL_MIN_VAL = 0.3
 
+# Cascade classifier: colors within about one band of a threshold are
+# borderline and escalate from the thumbnail check to the full analysis.
+THUMB_SIZE = 64  # longest side of the fast-path thumbnail
+HUE_BAND = 5.0  # degrees
+SAT_BAND = 0.05
+VAL_BAND = 0.05
+CONFIDENCE_THRESHOLD = 0.75
 
-def load_image(path: str) -> Image.Image:
-    """Load an image (PNG or JPEG) and convert to RGB."""
-    img = Image.open(path)
+# Admission control: limits are checked against the file size and header
+# dimensions before any pixel data is decoded.
+MAX_FILE_BYTES = 64 * 1024 * 1024  # compressed bytes on disk
+PIXEL_BUDGET = 16_000_000  # pixels kept per decoded image
+MAX_DECODE_BYTES = 256 * 1024 * 1024  # source frame + RGB copy + resized frame
+MAX_HEADER_PIXELS = 1_000_000_000  # rejected outright from the header
+
+# We enforce our own limits above; Pillow's default bomb check would refuse
+# large JPEGs that the reduced-scale path can handle. Anything Pillow still
+# flags is reported as ImageRejected by load_image.
+Image.MAX_IMAGE_PIXELS = MAX_HEADER_PIXELS
+
+
+class ImageRejected(ValueError):
+    """Raised when an image exceeds the memory budget and cannot be admitted."""
+
+
+def decode_bytes(img: Image.Image) -> int:
+    """Bytes to decode `img` in its own mode and then convert it to RGB."""
+    mode = ImageMode.getmode(img.mode)
+    bpp = len(mode.bands) * np.dtype(mode.typestr).itemsize
+    # Pillow stores multi-band 8-bit pixels (LA, RGB, RGBA, ...) in 4 bytes
+    if len(mode.bands) > 1:
+        bpp = max(bpp, 4)
+    pixels = img.width * img.height
+    return pixels * bpp + pixels * 4  # source frame + RGB copy
+
+
+def load_image(path: str, pixel_budget: int = PIXEL_BUDGET) -> Image.Image:
+    """Load an image (PNG or JPEG) and convert to RGB.
+
+    Images above `pixel_budget` are decoded at reduced scale (JPEG DCT
+    scaling where available) and downsized to fit; the original size is kept
+    in ``img.info["reduced_from"]``. Images that cannot fit the budget raise
+    ImageRejected.
+    """
+    size = os.path.getsize(path)
+    if size > MAX_FILE_BYTES:
+        raise ImageRejected(f"file is {size:,} bytes (limit {MAX_FILE_BYTES:,})")
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", Image.DecompressionBombWarning)
+            img = Image.open(path)
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning) as e:
+        raise ImageRejected(str(e)) from e
+    try:
+        return _admit(img, pixel_budget)
+    except BaseException:
+        img.close()
+        raise
+
+
+def _admit(img: Image.Image, pixel_budget: int) -> Image.Image:
     if img.format not in ("PNG", "JPEG", "JPG"):
         raise ValueError("Input image must be PNG or JPEG format")
-    return img.convert("RGB")
+    width, height = img.size
+    pixels = width * height
+    if pixels > MAX_HEADER_PIXELS:
+        raise ImageRejected(f"{width}x{height} exceeds {MAX_HEADER_PIXELS:,} pixels")
+
+    scale = math.sqrt(min(1.0, pixel_budget / pixels))
+    target = (max(1, int(width * scale)), max(1, int(height * scale)))
+    if pixels > pixel_budget and img.format == "JPEG":
+        # Decode at 1/2, 1/4 or 1/8 scale instead of the full frame
+        img.draft("RGB", target)
+    needed = decode_bytes(img)
+    if img.width * img.height > pixel_budget:
+        # The source frame and its RGB copy are still alive while resize allocates the target
+        needed += target[0] * target[1] * 4
+    if needed > MAX_DECODE_BYTES:
+        raise ImageRejected(
+            f"{width}x{height} {img.format} ({img.mode}) needs {needed:,} bytes to decode (limit {MAX_DECODE_BYTES:,})"
+        )
+    img = img.convert("RGB")
+    if pixels <= pixel_budget:
+        return img
+    if img.width * img.height > pixel_budget:
+        img = img.resize(target, Image.BILINEAR)
+    img.info["reduced_from"] = (width, height)
+    return img
+
+
+def analysis_pixels(img: Image.Image) -> np.ndarray:
+    """(N, 3) pixel array for color analysis, downsampled above 1 MP."""
+    # Downsample for speed before materializing the pixel array
+    if img.width * img.height > 1_000_000:
+        img = img.resize((800, max(1, int(800 * img.height / img.width))))
+    return np.asarray(img).reshape(-1, 3)
 
 
 def average_color(img: Image.Image) -> Tuple[float, float, float]:
-    arr = np.array(img)
-    # Downsample for speed
-    if arr.shape[0] * arr.shape[1] > 1_000_000:
-        img_small = img.resize((800, int(800 * img.height / img.width)))
-        arr = np.array(img_small)
     # Compute mean RGB
-    mean_rgb = arr.reshape(-1, 3).mean(axis=0)
-    return tuple(mean_rgb.tolist())
+    return tuple(analysis_pixels(img).mean(axis=0).tolist())
 
 
 def rgb_to_hsv(rgb: Tuple[float, float, float]) -> Tuple[float, float, float]:
@@ -48,26 +138,109 @@ def rgb_to_hsv(rgb: Tuple[float, float, float]) -> Tuple[float, float, float]:
     return h, s, v
 
 
-def looks_wood_like(img: Image.Image) -> bool:
-    mean_rgb = average_color(img)
-    h, s, v = rgb_to_hsv(mean_rgb)
+def is_wood_hsv(h: float, s: float, v: float) -> bool:
     # Map to rough brown range: ~15-45 degrees on 0-360 hue
-    return 15 <= h <= 45 and s >= 0.2 and v >= 0.2
+    return WOOD_HUE_RANGE[0] <= h <= WOOD_HUE_RANGE[1] and s >= WOOD_MIN_SAT and v >= WOOD_MIN_VAL
+
+
+def is_metallic_hsv(h: float, s: float, v: float) -> bool:
+    # Metallic: low saturation (grayish) and moderate to high value
+    return s <= METAL_MAX_SAT and v >= METAL_MIN_VAL
+
+
+def looks_wood_like(img: Image.Image) -> bool:
+    return is_wood_hsv(*rgb_to_hsv(average_color(img)))
 
 
 def looks_metallic(img: Image.Image) -> bool:
     """Detect if image looks metallic/mechanical (gray, silver tones with low saturation)."""
-    mean_rgb = average_color(img)
-    h, s, v = rgb_to_hsv(mean_rgb)
-    # Metallic: low saturation (grayish) and moderate to high value
-    return s <= 0.3 and v >= 0.3
+    return is_metallic_hsv(*rgb_to_hsv(average_color(img)))
 
 
-def detect_component_type(img: Image.Image) -> str:
-    """Detect whether image shows wood, metal/mechanical, or other component."""
-    if looks_metallic(img):
+def label_from_hsv(h: float, s: float, v: float) -> str:
+    if is_metallic_hsv(h, s, v):
         return "mechanical"
-    elif looks_wood_like(img):
+    if is_wood_hsv(h, s, v):
         return "wood"
+    return "unknown"
+
+
+def decision_margin(h: float, s: float, v: float) -> float:
+    """Distance from (h, s, v) to the nearest threshold that would change the label.
+
+    Each axis is measured in units of its band (HUE_BAND, SAT_BAND, VAL_BAND),
+    so a margin of 1.0 means the color is one full band away from flipping.
+    """
+    # Distance to the metallic region (inside: distance to leave it)
+    if is_metallic_hsv(h, s, v):
+        return min((METAL_MAX_SAT - s) / SAT_BAND, (v - METAL_MIN_VAL) / VAL_BAND)
+    to_metal = max(max(0.0, s - METAL_MAX_SAT) / SAT_BAND, max(0.0, METAL_MIN_VAL - v) / VAL_BAND)
+
+    lo, hi = WOOD_HUE_RANGE
+    if is_wood_hsv(h, s, v):
+        to_wood = min((h - lo) / HUE_BAND, (hi - h) / HUE_BAND, (s - WOOD_MIN_SAT) / SAT_BAND, (v - WOOD_MIN_VAL) / VAL_BAND)
     else:
-        return "unknown"
+        hue_gap = 0.0 if lo <= h <= hi else min(abs(h - lo), abs(h - hi), 360 - abs(h - lo), 360 - abs(h - hi))
+        to_wood = max(hue_gap / HUE_BAND, max(0.0, WOOD_MIN_SAT - s) / SAT_BAND, max(0.0, WOOD_MIN_VAL - v) / VAL_BAND)
+    return min(to_metal, to_wood)
+
+
+def margin_confidence(margin: float) -> float:
+    """Map a decision margin to [0.5, 1.0]: 0.5 on a threshold, 1.0 two bands away."""
+    return 0.5 + 0.5 * min(1.0, margin / 2.0)
+
+
+def thumbnail_mean_color(img: Image.Image, size: int = THUMB_SIZE) -> Tuple[float, float, float]:
+    """Mean RGB of a box-reduced thumbnail (cheap: one pass in C, tiny array)."""
+    factor = max(1, max(img.size) // size)
+    arr = np.asarray(img.reduce(factor) if factor > 1 else img, dtype=np.float64)
+    return tuple(arr.reshape(-1, 3).mean(axis=0).tolist())
+
+
+def hsv_arrays(arr: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized rgb_to_hsv over an (N, 3) uint8 array."""
+    rgb = arr.astype(np.float64) / 255.0
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    mx = rgb.max(axis=1)
+    df = mx - rgb.min(axis=1)
+    safe = np.where(df == 0, 1.0, df)
+    h = np.where(mx == r, (60 * ((g - b) / safe) + 360) % 360,
+                 np.where(mx == g, (60 * ((b - r) / safe) + 120) % 360, (60 * ((r - g) / safe) + 240) % 360))
+    h = np.where(df == 0, 0.0, h)
+    s = np.where(mx == 0, 0.0, df / np.where(mx == 0, 1.0, mx))
+    return h, s, mx
+
+
+class Classification(NamedTuple):
+    label: str
+    confidence: float
+    path: str  # "fast" or "slow"
+
+
+def classify_component(img: Image.Image) -> Classification:
+    """Cascade classifier: tiny-thumbnail check first, full analysis only when borderline."""
+    h, s, v = rgb_to_hsv(thumbnail_mean_color(img))
+    confidence = margin_confidence(decision_margin(h, s, v))
+    if confidence >= CONFIDENCE_THRESHOLD:
+        return Classification(label_from_hsv(h, s, v), confidence, "fast")
+
+    # Slow path: label from the higher-resolution mean (the original rule), with
+    # confidence blended from its margin and the per-pixel agreement histogram.
+    # Both use the same downsampled frame, so it is resampled only once.
+    pixels = analysis_pixels(img)
+    h, s, v = rgb_to_hsv(tuple(pixels.mean(axis=0).tolist()))
+    label = label_from_hsv(h, s, v)
+    ph, ps, pv = hsv_arrays(pixels)
+    metal = (ps <= METAL_MAX_SAT) & (pv >= METAL_MIN_VAL)
+    wood = ~metal & (ph >= WOOD_HUE_RANGE[0]) & (ph <= WOOD_HUE_RANGE[1]) & (ps >= WOOD_MIN_SAT) & (pv >= WOOD_MIN_VAL)
+    votes = {"mechanical": metal.mean(), "wood": wood.mean(), "unknown": 1.0 - metal.mean() - wood.mean()}
+    # Votes are mapped onto [0.5, 1.0] like margins, so the score keeps the
+    # same range and meaning on both paths.
+    vote_confidence = 0.5 + 0.5 * float(votes[label])
+    confidence = 0.5 * margin_confidence(decision_margin(h, s, v)) + 0.5 * vote_confidence
+    return Classification(label, confidence, "slow")
+
+
+def detect_component_type(img: Image.Image) -> str:
+    """Detect whether image shows wood, metal/mechanical, or other component."""
+    return classify_component(img).label
@@ -1,13 +1,22 @@
 import argparse
+import csv
 import os
+from contextlib import ExitStack
 from tabulate import tabulate
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from PIL import Image, ImageDraw
 
-from src.bom_templates import default_wood_table_bom, choose_bom_from_filename
-from src.image_analyzer import load_image, looks_wood_like, detect_component_type
+from src.bom_templates import TEMPLATES, default_wood_table_bom, choose_bom_from_filename, template_name_from_filename
+from src.image_analyzer import load_image, looks_wood_like, classify_component, Classification, ImageRejected
+from src.pricing import open_catalog, is_csv_catalog, iso_date, import_prices_csv, seed_prices_from_templates, load_prices, apply_prices, reprice_columns
+from src.report import write_results_csv, read_results_columns, write_results_columns, gc_paused, JsonlWriter, ArrowWriter
+from src.profiling import profile_session
+from src.store import open_store, now_timestamp, start_run, save_results, assemblies_using_material, cost_trend, top_parts, reprice_store, iter_run_lines, run_assemblies
+from src.diff import diff_lines, template_lines, DIFF_FIELDS
 from config import INPUT_IMAGES_DIR
 
+DIFF_PRINT_LIMIT = 50  # changed lines shown on stdout; use --diff-csv for all
+
 
 
 def format_currency(value: float) -> str:
@@ -133,21 +142,88 @@ def generate_demo_image(path: str, image_type: str = "table"):
 
 
 
-def build_bom_from_image(image_path: str) -> List[Dict[str, object]]:
+def build_bom_from_image(image_path: str) -> Tuple[List[Dict[str, object]], Classification]:
     img = load_image(image_path)
-    component_type = detect_component_type(img)
+    if "reduced_from" in img.info:
+        w, h = img.info["reduced_from"]
+        print(f"[INFO] Oversized image {w}x{h} decoded at reduced scale {img.width}x{img.height}")
+    result = classify_component(img)
     bom = choose_bom_from_filename(os.path.basename(image_path))
     
-    if component_type == "mechanical":
-        print(f"[INFO] Detected mechanical/automotive component")
-    elif component_type == "wood":
-        print(f"[INFO] Detected wood-like component")
+    if result.label == "mechanical":
+        print(f"[INFO] Detected mechanical/automotive component (confidence {result.confidence:.2f}, {result.path} path)")
+    elif result.label == "wood":
+        print(f"[INFO] Detected wood-like component (confidence {result.confidence:.2f}, {result.path} path)")
     else:
-        print(f"[WARN] Component type uncertain; using BOM based on filename")
+        print(f"[WARN] Component type uncertain (confidence {result.confidence:.2f}); using BOM based on filename")
     
-    return bom
+    return bom, result
+
+
+
+
+def diff_source(token: str, other: str, label: str, store, prices: Optional[Dict[str, float]]):
+    if token in TEMPLATES:
+        if other not in TEMPLATES:
+            raise ValueError(f"template '{token}' can only be diffed against another template")
+        # Same assembly label on both sides so template lines join directly
+        return template_lines([(label, token, 1)], prices)
+    if store is None:
+        raise ValueError("diffing runs requires --store")
+    if token == "templates":
+        if not other.isdigit():
+            raise ValueError("'templates' must be diffed against a run id")
+        return template_lines(run_assemblies(store, int(other)), prices)
+    if token.isdigit():
+        return iter_run_lines(store, int(token))
+    raise ValueError(f"unknown diff source '{token}' (expected run id, 'templates' or template name)")
+
 
+def run_diff(args: argparse.Namespace, store, prices: Optional[Dict[str, float]]):
+    old_token, new_token = args.diff
+    try:
+        label = f"{old_token}->{new_token}"
+        old = diff_source(old_token, new_token, label, store, prices)
+        new = diff_source(new_token, old_token, label, store, prices)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return
+    changes, deltas = diff_lines(old, new)
 
+    print(f"\n=== BOM Diff ({old_token} -> {new_token}) ===")
+    table = [
+        [
+            c["assembly"], c["Item No"], c["Part Name"], c["change"],
+            c["Old Quantity"], c["New Quantity"],
+            "" if c["Old Unit Price"] is None else format_currency(c["Old Unit Price"]),
+            "" if c["New Unit Price"] is None else format_currency(c["New Unit Price"]),
+            format_currency(c["Cost Delta"]),
+        ]
+        for c in changes[:DIFF_PRINT_LIMIT]
+    ]
+    print(tabulate(table, headers=DIFF_FIELDS, tablefmt="grid"))
+    if len(changes) > DIFF_PRINT_LIMIT:
+        print(f"[INFO] Showing {DIFF_PRINT_LIMIT} of {len(changes)} changed lines")
+    if args.diff_csv:
+        os.makedirs(os.path.dirname(args.diff_csv) or ".", exist_ok=True)
+        with open(args.diff_csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=DIFF_FIELDS)
+            writer.writeheader()
+            writer.writerows(changes)
+        print(f"[INFO] Wrote {len(changes)} changed lines to {args.diff_csv}")
+
+    print(f"\n=== Cost Delta by Assembly ===")
+    for assembly, delta in sorted(deltas.items()):
+        print(f" - {assembly}: {format_currency(delta)}")
+    print(f"Overall Delta: {format_currency(sum(deltas.values()))} ({len(deltas)} assemblies changed)")
+
+
+
+def positive_int(value: str) -> int:
+    n = int(value)
+    if n <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return n
 
 def main():
     parser = argparse.ArgumentParser(description="CAD-EL BOM Generator - Wood and Automotive/Mechanical Assemblies")
@@ -157,8 +233,92 @@ def main():
     parser.add_argument("--demo-engine", action="store_true", help="Generate demo engine image and run BOM")
     parser.add_argument("--demo3", action="store_true", help="Generate 3 demo images (table/chair/shelf) and process")
     parser.add_argument("--demo", action="store_true", help="Generate a demo table PNG and run BOM")
+    parser.add_argument("--price-catalog", type=str, help="Price catalog (SQLite .db or CSV) overriding template prices")
+    parser.add_argument("--as-of", type=iso_date, help="Effective date (YYYY-MM-DD) for catalog prices; defaults to today")
+    parser.add_argument("--import-prices", type=str, help="CSV of part_key,effective_date,unit_price to load into the catalog")
+    parser.add_argument("--seed-prices", action="store_true", help="Copy current template prices into the catalog")
+    parser.add_argument("--save-results", type=str, help="Write BOM lines of this run to a results CSV")
+    parser.add_argument("--reprice", type=str, help="Reprice stored results from the catalog without re-analyzing images: a results CSV (in place) or a store database (written as a new run)")
+    parser.add_argument("--store", type=str, help="SQLite result store; every run is recorded there")
+    parser.add_argument("--run-id", type=int, help="Restrict store queries/repricing to one run")
+    parser.add_argument("--query-material", type=str, help="List assemblies using a material, e.g. 'Forged steel'")
+    parser.add_argument("--query-trend", type=str, help="Show the cost trend of an assembly across runs")
+    parser.add_argument("--query-top", type=int, nargs="?", const=20, help="Show the top N parts by extended cost (default 20)")
+    parser.add_argument("--jsonl", type=str, help="Append one JSON line per assembly to this file as results are computed")
+    parser.add_argument("--arrow", type=str, help="Stream BOM lines to a .parquet file or .arrow IPC stream (requires pyarrow)")
+    parser.add_argument("--row-group-size", type=positive_int, default=10_000, help="Rows buffered per Arrow/Parquet row group")
+    parser.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"),
+                        help="Diff two BOM sources: run ids from --store, 'templates' (current templates for the other run's assemblies), or two template names")
+    parser.add_argument("--diff-csv", type=str, help="Write every changed line of --diff to this CSV")
+    parser.add_argument("--profile", type=str, help="Profile the run and write .prof and collapsed-stack files to this directory")
     args = parser.parse_args()
 
+    if args.profile:
+        with profile_session(args.profile):
+            run(args)
+    else:
+        run(args)
+
+
+def run(args: argparse.Namespace):
+    store = open_store(args.store) if args.store else None
+    querying = bool(args.query_material or args.query_trend) or args.query_top is not None
+    if store is None and querying:
+        print("[ERROR] --query-* options require --store.")
+        return
+    if args.query_material:
+        rows = assemblies_using_material(store, args.query_material, args.run_id)
+        print(tabulate(rows, headers=["Assembly", "Part Name"], tablefmt="grid"))
+    if args.query_trend:
+        rows = [(run_id, started, format_currency(total)) for run_id, started, total in cost_trend(store, args.query_trend)]
+        print(tabulate(rows, headers=["Run", "Started", "Total"], tablefmt="grid"))
+    if args.query_top is not None:
+        rows = [
+            (asm, part, qty, format_currency(unit), format_currency(sub))
+            for asm, part, qty, unit, sub in top_parts(store, args.query_top, args.run_id)
+        ]
+        print(tabulate(rows, headers=["Assembly", "Part Name", "Quantity", "Unit Price", "Subtotal"], tablefmt="grid"))
+    if querying:
+        return
+
+    if not args.price_catalog and (args.import_prices or args.seed_prices or args.reprice):
+        print("[ERROR] --import-prices/--seed-prices/--reprice require --price-catalog.")
+        return
+    if (args.import_prices or args.seed_prices) and is_csv_catalog(args.price_catalog):
+        print("[ERROR] CSV price catalogs are read-only; use a SQLite catalog (.db) with --import-prices/--seed-prices.")
+        return
+    catalog = open_catalog(args.price_catalog) if args.price_catalog else None
+    if args.seed_prices:
+        n = seed_prices_from_templates(catalog, args.as_of)
+        print(f"[INFO] Seeded {n} template prices into {args.price_catalog}")
+    if args.import_prices:
+        n = import_prices_csv(catalog, args.import_prices)
+        print(f"[INFO] Imported {n} prices from {args.import_prices}")
+    prices = load_prices(catalog, args.as_of) if catalog is not None else None
+
+    if args.reprice and not args.reprice.lower().endswith(".csv"):
+        try:
+            source, new_run, n = reprice_store(open_store(args.reprice), prices, args.run_id)
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            return
+        print(f"[INFO] Repriced run {source} as new run {new_run} ({n} lines) in {args.reprice}")
+        return
+    if args.reprice:
+        with gc_paused():
+            columns = read_results_columns(args.reprice)
+            totals = reprice_columns(columns, prices)
+            write_results_columns(columns, args.reprice)
+        print(f"[INFO] Repriced {len(columns['assembly'])} lines across {len(totals)} assemblies in {args.reprice}")
+        print(f"Overall Total: {format_currency(sum(totals.values()))}")
+        return
+    if args.diff:
+        run_diff(args, store, prices)
+        return
+    if args.seed_prices or args.import_prices:
+        if not (args.image or args.images or args.dir or args.demo or args.demo_engine or args.demo3):
+            return
+
     def resolve_image_path(arg_path: Optional[str]) -> Optional[str]:
         # If a path was provided and exists, use it
         if arg_path and os.path.exists(arg_path):
@@ -491,18 +651,44 @@ def main():
         print(f"[INFO] Using image: {resolved}")
 
     results = []
-    for p in candidates:
-        try:
-            items = build_bom_from_image(p)
-        except Exception as e:
-            print(f"[ERROR] Failed to analyze image '{p}': {e}")
-            continue
-        totals = compute_totals(items)
-        asm_name = os.path.basename(p)
-        print(f"\n=== Bill of Materials ({asm_name}) ===")
-        print_bom(items)
-        print(f"\nAssembly Total: {format_currency(totals['grand_total'])}")
-        results.append({"assembly": asm_name, "items": items, "total": totals['grand_total']})
+    rejected = []
+    started_at = now_timestamp()
+    # Writers are closed even on Ctrl-C so Parquet footers are always written
+    with ExitStack() as stack:
+        emitters = []
+        if args.arrow:
+            emitters.append(stack.enter_context(ArrowWriter(args.arrow, args.row_group_size)))
+        if args.jsonl:
+            emitters.append(stack.enter_context(JsonlWriter(args.jsonl)))
+
+        for p in candidates:
+            try:
+                items, classification = build_bom_from_image(p)
+            except ImageRejected as e:
+                print(f"[WARN] Rejected image '{p}': {e}")
+                rejected.append((p, str(e)))
+                continue
+            except Exception as e:
+                print(f"[ERROR] Failed to analyze image '{p}': {e}")
+                continue
+            asm_name = os.path.basename(p)
+            template = template_name_from_filename(asm_name)
+            if prices is not None:
+                apply_prices(items, template, prices)
+            totals = compute_totals(items)
+            print(f"\n=== Bill of Materials ({asm_name}) ===")
+            print_bom(items)
+            print(f"\nAssembly Total: {format_currency(totals['grand_total'])}")
+            results.append({
+                "assembly": asm_name,
+                "template": template,
+                "items": items,
+                "total": totals['grand_total'],
+                "component_type": classification.label,
+                "confidence": classification.confidence,
+            })
+            for emitter in emitters:
+                emitter.write(results[-1])
 
     # Summary
     if len(results) > 0:
@@ -511,8 +697,19 @@ def main():
         for r in results:
             print(f" - {r['assembly']}: {format_currency(r['total'])} ({len(r['items'])} items)")
         print(f"Overall Total: {format_currency(overall)}")
+        if args.save_results:
+            write_results_csv(results, args.save_results)
+            print(f"[INFO] Saved results to {args.save_results}")
+        if store is not None:
+            run_id = start_run(store, started_at)
+            n = save_results(store, run_id, results)
+            print(f"[INFO] Stored run {run_id} ({n} lines) in {args.store}")
     else:
         print("\n[ERROR] No BOMs generated. Check input images.")
+    if rejected:
+        print(f"\n[WARN] {len(rejected)} image(s) rejected by memory limits:")
+        for p, reason in rejected:
+            print(f" - {p}: {reason}")
 
 
 if __name__ == "__main__":
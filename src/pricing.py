@@ -0,0 +1,138 @@
+import csv
+import sqlite3
+from datetime import date
+from typing import List, Dict, Optional, Sequence
+
+import numpy as np
+
+from src.bom_templates import TEMPLATES
+
+# Price catalog keyed by "<template>/<Part Name>" with effective dates.
+# Dates are ISO strings (YYYY-MM-DD) so lexical order matches date order.
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    part_key TEXT NOT NULL,
+    effective_date TEXT NOT NULL,
+    unit_price REAL NOT NULL,
+    PRIMARY KEY (part_key, effective_date)
+) WITHOUT ROWID
+"""
+
+CATALOG_FIELDS = ["part_key", "effective_date", "unit_price"]
+
+
+def part_key(template: str, part_name: str) -> str:
+    return f"{template}/{part_name}"
+
+
+def iso_date(value: str) -> str:
+    """Validate a YYYY-MM-DD date; raises ValueError otherwise."""
+    if len(value) != 10:
+        raise ValueError(f"invalid date '{value}', expected YYYY-MM-DD")
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f"invalid date '{value}', expected YYYY-MM-DD") from None
+
+
+def is_csv_catalog(path: str) -> bool:
+    return path.lower().endswith(".csv")
+
+
+def open_catalog(path: str) -> sqlite3.Connection:
+    """Open a SQLite price catalog, or load a CSV catalog into memory.
+
+    CSV catalogs are read-only: writes to the returned connection are not saved.
+    """
+    if is_csv_catalog(path):
+        conn = sqlite3.connect(":memory:")
+        conn.execute(CATALOG_SCHEMA)
+        import_prices_csv(conn, path)
+        return conn
+    conn = sqlite3.connect(path)
+    conn.execute(CATALOG_SCHEMA)
+    return conn
+
+
+def import_prices_csv(conn: sqlite3.Connection, csv_path: str) -> int:
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        rows = [
+            (r["part_key"], iso_date(r["effective_date"]), float(r["unit_price"]))
+            for r in csv.DictReader(f)
+        ]
+    conn.executemany("INSERT OR REPLACE INTO prices VALUES (?, ?, ?)", rows)
+    conn.commit()
+    return len(rows)
+
+
+def seed_prices_from_templates(conn: sqlite3.Connection, effective_date: Optional[str] = None) -> int:
+    """Copy the hard-coded template prices into the catalog."""
+    effective_date = iso_date(effective_date) if effective_date else date.today().isoformat()
+    rows = []
+    for template, build in TEMPLATES.items():
+        for item in build():
+            rows.append((part_key(template, str(item["Part Name"])), effective_date, float(item["Unit Price"])))
+    conn.executemany("INSERT OR REPLACE INTO prices VALUES (?, ?, ?)", rows)
+    conn.commit()
+    return len(rows)
+
+
+def load_prices(conn: sqlite3.Connection, as_of: Optional[str] = None) -> Dict[str, float]:
+    """Return the price in effect on `as_of` (default today) for every part key."""
+    as_of = iso_date(as_of) if as_of else date.today().isoformat()
+    cur = conn.execute(
+        """
+        SELECT p.part_key, p.unit_price
+        FROM prices p
+        JOIN (
+            SELECT part_key, MAX(effective_date) AS effective_date
+            FROM prices
+            WHERE effective_date <= ?
+            GROUP BY part_key
+        ) latest
+        ON p.part_key = latest.part_key AND p.effective_date = latest.effective_date
+        """,
+        (as_of,),
+    )
+    return dict(cur.fetchall())
+
+
+def apply_prices(items: List[Dict[str, object]], template: str, prices: Dict[str, float]) -> int:
+    """Overwrite unit prices in a BOM with catalog prices; returns rows changed."""
+    changed = 0
+    for row in items:
+        price = prices.get(part_key(template, str(row["Part Name"])))
+        if price is not None:
+            row["Unit Price"] = price
+            changed += 1
+    return changed
+
+
+def reprice_columns(columns: Dict[str, Sequence], prices: Dict[str, float]) -> Dict[str, float]:
+    """Reprice stored BOM lines in bulk and return new totals per assembly.
+
+    `columns` maps RESULT_FIELDS names to equal-length column sequences (as
+    read by src.report.read_results_columns); "Unit Price" and "Subtotal" are
+    replaced with numpy arrays. Parts missing from the catalog keep their
+    stored unit price.
+    """
+    n = len(columns["assembly"])
+    if n == 0:
+        return {}
+    # Hash join on part key, one dict probe per line
+    catalog = np.fromiter(
+        (prices.get(f"{t}/{p}", np.nan) for t, p in zip(columns["Template"], columns["Part Name"])),
+        dtype=float,
+        count=n,
+    )
+    stored = np.asarray(columns["Unit Price"], dtype=float)
+    unit = np.where(np.isnan(catalog), stored, catalog)
+    subtotal = np.asarray(columns["Quantity"], dtype=float) * unit
+    columns["Unit Price"] = unit
+    columns["Subtotal"] = subtotal
+
+    index: Dict[str, int] = {}
+    codes = np.fromiter((index.setdefault(a, len(index)) for a in columns["assembly"]), dtype=np.int64, count=n)
+    totals = np.bincount(codes, weights=subtotal, minlength=len(index))
+    return dict(zip(index, totals.tolist()))
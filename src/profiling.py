@@ -0,0 +1,90 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+
+from tabulate import tabulate
+
+# Pipeline stages reported separately in the profile summary.
+STAGES = ("load_image", "classify_component", "average_color", "rgb_to_hsv", "choose_bom_from_filename", "compute_totals", "print_bom")
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer and counts collapsed stacks."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def write_collapsed(self, path: str) -> str:
+        """Write stacks in the folded format read by flamegraph.pl / speedscope."""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+def stage_times(profiler: cProfile.Profile) -> Dict[str, Tuple[int, float]]:
+    """(calls, cumulative seconds) per pipeline stage from a finished profile."""
+    times = {name: (0, 0.0) for name in STAGES}
+    for (filename, _line, func), (_cc, nc, _tt, ct, _callers) in pstats.Stats(profiler).stats.items():
+        if func in times and os.path.abspath(filename).startswith(SRC_DIR):
+            calls, total = times[func]
+            times[func] = (calls + nc, total + ct)
+    return times
+
+
+@contextmanager
+def profile_session(out_dir: str, label: str = "main") -> Iterator[cProfile.Profile]:
+    """Profile the enclosed block of the current thread.
+
+    Writes <label>-<pid>.prof (cProfile/pstats) and <label>-<pid>.collapsed
+    (sampled stacks for flame graphs) to `out_dir`. The pid suffix keeps files
+    from separate worker processes apart, so each worker can open its own
+    session.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    profiler = cProfile.Profile()
+    sampler = StackSampler(threading.get_ident())
+    sampler.start()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        sampler.stop()
+        base = os.path.join(out_dir, f"{label}-{os.getpid()}")
+        profiler.dump_stats(base + ".prof")
+        sampler.write_collapsed(base + ".collapsed")
+        table = [[name, calls, f"{total:.4f}"] for name, (calls, total) in stage_times(profiler).items()]
+        print(f"\n=== Profile ({label}, pid {os.getpid()}) ===")
+        print(tabulate(table, headers=["Stage", "Calls", "Cumulative (s)"], tablefmt="grid"))
+        print(f"[INFO] Wrote {base}.prof and {base}.collapsed")
@@ -1,8 +1,10 @@
 import os
 import csv
+import gc
+import json
 from datetime import datetime
-from typing import List, Dict
-from openpyxl import Workbook
+from contextlib import contextmanager
+from typing import Iterator, List, Dict, Sequence
 from config import OUTPUT_DIR, REPORT_BASE_NAME
 
 
@@ -26,6 +28,8 @@ def write_csv(items: List[Dict[str, str]], base_name: str) -> str:
 
 
 def write_xlsx(items: List[Dict[str, str]], base_name: str) -> str:
+    from openpyxl import Workbook
+
     ensure_output_dir()
     wb = Workbook()
     ws = wb.active
@@ -36,3 +40,159 @@ def write_xlsx(items: List[Dict[str, str]], base_name: str) -> str:
     path = os.path.join(OUTPUT_DIR, f"{base_name}.xlsx")
     wb.save(path)
     return path
+
+
+# Long-format results file: one line per BOM row, tagged with its assembly.
+RESULT_FIELDS = ["assembly", "Template", "Level", "Item No", "Part Name", "Quantity", "Unit Price", "Subtotal", "Material"]
+
+
+def result_rows(result: Dict[str, object]) -> List[Dict[str, object]]:
+    """Flatten one assembly result into long-format rows keyed by RESULT_FIELDS."""
+    return [
+        {**{k: row.get(k) for k in RESULT_FIELDS}, "assembly": result["assembly"], "Template": result["template"]}
+        for row in result["items"]
+    ]
+
+
+def write_results_csv(results: List[Dict[str, object]], path: str) -> str:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for r in results:
+            writer.writerows(result_rows(r))
+    return path
+
+
+@contextmanager
+def gc_paused() -> Iterator[None]:
+    """Pause the cyclic GC around bulk reads/writes of results files.
+
+    Millions of short-lived row containers make the collector rescan
+    repeatedly; none of them form cycles, so collection is wasted work.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def read_results_columns(path: str) -> Dict[str, tuple]:
+    """Read a results CSV column-wise: field name -> tuple of string values."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        columns = list(zip(*list(reader))) or [()] * len(header)
+    return dict(zip(header, columns))
+
+
+def write_results_columns(columns: Dict[str, Sequence], path: str) -> str:
+    """Write columns back as a results CSV, replacing `path` atomically."""
+    out = [columns[name].tolist() if hasattr(columns[name], "tolist") else columns[name] for name in RESULT_FIELDS]
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(RESULT_FIELDS)
+        writer.writerows(zip(*out))
+    os.replace(tmp, path)
+    return path
+
+
+class JsonlWriter:
+    """Streams one JSON object per assembly, flushed as soon as it is written."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._f = open(path, "a", encoding="utf-8")
+
+    def write(self, result: Dict[str, object]):
+        record = {
+            "assembly": result["assembly"],
+            "template": result["template"],
+            "total": result["total"],
+            "component_type": result.get("component_type"),
+            "confidence": result.get("confidence"),
+            "items": result["items"],
+        }
+        self._f.write(json.dumps(record) + "\n")
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ArrowWriter:
+    """Writes BOM lines to Parquet (.parquet) or an Arrow IPC stream (.arrow).
+
+    Rows are buffered and written in row groups of at most `row_group_size`
+    rows, so memory stays bounded however long the run is. Arrow streams can be read while the
+    run is still going; Parquet files become readable once closed.
+    Requires the optional pyarrow package.
+    """
+
+    def __init__(self, path: str, row_group_size: int = 10_000):
+        if row_group_size <= 0:
+            raise ValueError(f"row_group_size must be positive, got {row_group_size}")
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("Arrow/Parquet output requires pyarrow (pip install pyarrow)") from e
+        self._pa = pa
+        self.schema = pa.schema([
+            ("assembly", pa.string()),
+            ("Template", pa.string()),
+            ("Level", pa.int64()),
+            ("Item No", pa.string()),
+            ("Part Name", pa.string()),
+            ("Quantity", pa.int64()),
+            ("Unit Price", pa.float64()),
+            ("Subtotal", pa.float64()),
+            ("Material", pa.string()),
+        ])
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.row_group_size = row_group_size
+        self._buffer: List[Dict[str, object]] = []
+        self._sink = None
+        if path.lower().endswith(".parquet"):
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self._sink = pa.OSFile(path, "wb")
+            self._writer = pa.ipc.new_stream(self._sink, self.schema)
+
+    def write(self, result: Dict[str, object]):
+        self._buffer.extend(result_rows(result))
+        while len(self._buffer) >= self.row_group_size:
+            self._write_rows(self._buffer[:self.row_group_size])
+            self._buffer = self._buffer[self.row_group_size:]
+
+    def flush(self):
+        if self._buffer:
+            self._write_rows(self._buffer)
+            self._buffer = []
+
+    def _write_rows(self, rows: List[Dict[str, object]]):
+        self._writer.write_batch(self._pa.RecordBatch.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,175 @@
+import sqlite3
+from datetime import datetime
+from typing import Iterator, List, Dict, Optional, Tuple
+
+# Embedded SQLite store for BOM results: one row per run, one row per BOM line.
+
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    started_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bom_lines (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    assembly TEXT NOT NULL,
+    template TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    item_no TEXT NOT NULL,
+    part_name TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    unit_price REAL NOT NULL,
+    subtotal REAL NOT NULL,
+    material TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lines_run ON bom_lines(run_id);
+CREATE INDEX IF NOT EXISTS idx_lines_assembly ON bom_lines(assembly, run_id);
+CREATE INDEX IF NOT EXISTS idx_lines_part ON bom_lines(part_name);
+-- No material index: material queries are substring matches that no b-tree index can serve
+"""
+
+INSERT_LINE = "INSERT INTO bom_lines VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+
+def open_store(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(STORE_SCHEMA)
+    return conn
+
+
+def now_timestamp() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def start_run(conn: sqlite3.Connection, started_at: Optional[str] = None) -> int:
+    """Record a run; pass `started_at` (from now_timestamp) when the row is written after the work."""
+    cur = conn.execute("INSERT INTO runs (started_at) VALUES (?)", (started_at or now_timestamp(),))
+    conn.commit()
+    return int(cur.lastrowid)
+
+
+def save_results(conn: sqlite3.Connection, run_id: int, results: List[Dict[str, object]]) -> int:
+    """Insert the BOM lines of `results` in a single transaction; returns rows written."""
+    rows = []
+    for r in results:
+        for row in r["items"]:
+            rows.append((
+                run_id,
+                r["assembly"],
+                r["template"],
+                int(row.get("Level", 0)),
+                str(row["Item No"]),
+                str(row["Part Name"]),
+                int(row.get("Quantity", 0)),
+                float(row.get("Unit Price", 0.0)),
+                float(row.get("Subtotal", 0.0)),
+                str(row.get("Material", "")),
+            ))
+    with conn:
+        conn.executemany(INSERT_LINE, rows)
+    return len(rows)
+
+
+def assemblies_using_material(conn: sqlite3.Connection, material: str, run_id: Optional[int] = None) -> List[Tuple[str, str]]:
+    """Distinct (assembly, part name) pairs whose material mentions `material`."""
+    sql = "SELECT DISTINCT assembly, part_name FROM bom_lines WHERE material LIKE ?"
+    params: list = [f"%{material}%"]
+    if run_id is not None:
+        sql += " AND run_id = ?"
+        params.append(run_id)
+    return conn.execute(sql + " ORDER BY assembly, part_name", params).fetchall()
+
+
+def cost_trend(conn: sqlite3.Connection, assembly: str) -> List[Tuple[int, str, float]]:
+    """(run_id, started_at, total) for every run that included `assembly`."""
+    return conn.execute(
+        """
+        SELECT l.run_id, r.started_at, SUM(l.subtotal)
+        FROM bom_lines l JOIN runs r ON r.run_id = l.run_id
+        WHERE l.assembly = ?
+        GROUP BY l.run_id
+        ORDER BY l.run_id
+        """,
+        (assembly,),
+    ).fetchall()
+
+
+def top_parts(conn: sqlite3.Connection, limit: int = 20, run_id: Optional[int] = None) -> List[Tuple[str, str, int, float, float]]:
+    """Top lines by extended cost: (assembly, part name, quantity, unit price, subtotal)."""
+    if run_id is None:
+        run_id = latest_run_id(conn)
+    return conn.execute(
+        """
+        SELECT assembly, part_name, quantity, unit_price, subtotal
+        FROM bom_lines WHERE run_id = ?
+        ORDER BY subtotal DESC LIMIT ?
+        """,
+        (run_id, limit),
+    ).fetchall()
+
+
+def latest_run_id(conn: sqlite3.Connection) -> Optional[int]:
+    row = conn.execute("SELECT MAX(run_id) FROM runs").fetchone()
+    return row[0]
+
+
+def iter_run_lines(conn: sqlite3.Connection, run_id: int) -> Iterator[Tuple[str, str, str, int, float]]:
+    """Stream (assembly, item no, part name, quantity, unit price) for one run."""
+    return conn.execute(
+        "SELECT assembly, item_no, part_name, quantity, unit_price FROM bom_lines WHERE run_id = ?",
+        (run_id,),
+    )
+
+
+def run_assemblies(conn: sqlite3.Connection, run_id: int) -> List[Tuple[str, str, int]]:
+    """(assembly, template name, occurrences) for one run.
+
+    An assembly name can occur several times in a run (same basename in two
+    folders); occurrences is the highest line count of any of its parts.
+    """
+    return conn.execute(
+        """
+        SELECT assembly, template, MAX(n) FROM (
+            SELECT assembly, template, COUNT(*) AS n
+            FROM bom_lines WHERE run_id = ?
+            GROUP BY assembly, template, item_no, part_name
+        )
+        GROUP BY assembly, template
+        """,
+        (run_id,),
+    ).fetchall()
+
+
+def reprice_store(conn: sqlite3.Connection, prices: Dict[str, float], run_id: Optional[int] = None) -> Tuple[int, int, int]:
+    """Reprice a stored run (default: latest) into a new run, keeping history.
+
+    The lines of the source run are copied in one set-based INSERT ... SELECT
+    joined with the catalog; parts missing from the catalog keep their price.
+    Returns (source run id, new run id, rows written).
+    """
+    source = run_id if run_id is not None else latest_run_id(conn)
+    if source is None:
+        raise ValueError("store has no runs to reprice")
+    if conn.execute("SELECT 1 FROM runs WHERE run_id = ?", (source,)).fetchone() is None:
+        raise ValueError(f"run {source} does not exist in the store")
+    with conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS reprice (part_key TEXT PRIMARY KEY, unit_price REAL NOT NULL)")
+        conn.execute("DELETE FROM temp.reprice")
+        conn.executemany("INSERT INTO temp.reprice VALUES (?, ?)", prices.items())
+        new_run = conn.execute("INSERT INTO runs (started_at) VALUES (?)", (now_timestamp(),)).lastrowid
+        # Keys match src.pricing.part_key: "<template>/<Part Name>".
+        cur = conn.execute(
+            """
+            INSERT INTO bom_lines
+            SELECT ?, l.assembly, l.template, l.level, l.item_no, l.part_name, l.quantity,
+                   COALESCE(p.unit_price, l.unit_price),
+                   l.quantity * COALESCE(p.unit_price, l.unit_price),
+                   l.material
+            FROM bom_lines l
+            LEFT JOIN temp.reprice p ON p.part_key = l.template || '/' || l.part_name
+            WHERE l.run_id = ?
+            """,
+            (new_run, source),
+        )
+    return source, int(new_run), cur.rowcount
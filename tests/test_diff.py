@@ -0,0 +1,32 @@
+from src.bom_templates import engine_assembly_bom
+from src.diff import diff_lines, template_lines
+from src.main import compute_totals
+from src.store import open_store, start_run, save_results, iter_run_lines, run_assemblies
+
+
+def store_duplicate_engine_run(tmp_path):
+    conn = open_store(str(tmp_path / "results.db"))
+    results = []
+    # Same basename twice, as with --dir over two subfolders
+    for _ in range(2):
+        items = engine_assembly_bom()
+        totals = compute_totals(items)
+        results.append({"assembly": "demo_engine.png", "template": "engine", "items": items, "total": totals["grand_total"]})
+    run_id = start_run(conn)
+    save_results(conn, run_id, results)
+    return conn, run_id
+
+
+def test_run_diffed_against_itself_has_no_changes(tmp_path):
+    conn, run_id = store_duplicate_engine_run(tmp_path)
+    changes, deltas = diff_lines(iter_run_lines(conn, run_id), iter_run_lines(conn, run_id))
+    assert changes == []
+    assert deltas == {}
+
+
+def test_run_diffed_against_unchanged_templates_has_no_changes(tmp_path):
+    conn, run_id = store_duplicate_engine_run(tmp_path)
+    assert run_assemblies(conn, run_id) == [("demo_engine.png", "engine", 2)]
+    changes, deltas = diff_lines(iter_run_lines(conn, run_id), template_lines(run_assemblies(conn, run_id)))
+    assert changes == []
+    assert deltas == {}
@@ -0,0 +1,73 @@
+import sqlite3
+
+import pytest
+
+from src.pricing import CATALOG_SCHEMA, load_prices, reprice_columns
+from src.store import open_store, start_run, save_results, reprice_store, iter_run_lines
+
+
+def catalog(rows):
+    conn = sqlite3.connect(":memory:")
+    conn.execute(CATALOG_SCHEMA)
+    conn.executemany("INSERT INTO prices VALUES (?, ?, ?)", rows)
+    return conn
+
+
+def test_load_prices_picks_latest_price_on_or_before_as_of():
+    conn = catalog([
+        ("engine/Crankshaft", "2026-01-01", 500.0),
+        ("engine/Crankshaft", "2026-06-01", 550.0),
+        ("engine/Crankshaft", "2027-01-01", 600.0),
+        ("engine/Oil Pump", "2026-03-15", 150.0),
+    ])
+    assert load_prices(conn, "2025-12-31") == {}
+    assert load_prices(conn, "2026-01-01") == {"engine/Crankshaft": 500.0}
+    assert load_prices(conn, "2026-05-31") == {"engine/Crankshaft": 500.0, "engine/Oil Pump": 150.0}
+    # Effective on the day itself; the 2027 row is still in the future
+    assert load_prices(conn, "2026-06-01") == {"engine/Crankshaft": 550.0, "engine/Oil Pump": 150.0}
+    assert load_prices(conn, "2030-01-01")["engine/Crankshaft"] == 600.0
+
+
+def test_load_prices_rejects_non_iso_dates():
+    with pytest.raises(ValueError):
+        load_prices(catalog([]), "2026-6-1")
+
+
+def test_reprice_columns_falls_back_to_stored_price_and_totals_per_assembly():
+    columns = {
+        "assembly": ("a.png", "a.png", "b.png"),
+        "Template": ("engine", "engine", "wood_table"),
+        "Part Name": ("Crankshaft", "Oil Pump", "Table Leg"),
+        "Quantity": ("1", "2", "4"),
+        "Unit Price": ("525.0", "145.0", "12.5"),
+        "Subtotal": ("525.0", "290.0", "50.0"),
+    }
+    prices = {"engine/Crankshaft": 600.0, "wood_table/Table Leg": 10.0}
+
+    totals = reprice_columns(columns, prices)
+
+    assert columns["Unit Price"].tolist() == [600.0, 145.0, 10.0]
+    assert columns["Subtotal"].tolist() == [600.0, 290.0, 40.0]
+    assert totals == {"a.png": 890.0, "b.png": 40.0}
+
+
+def test_reprice_store_writes_new_run_and_keeps_uncatalogued_prices(tmp_path):
+    conn = open_store(str(tmp_path / "results.db"))
+    items = [
+        {"Level": 0, "Item No": "1", "Part Name": "Crankshaft", "Quantity": 1, "Unit Price": 525.0, "Subtotal": 525.0, "Material": "Forged steel"},
+        {"Level": 0, "Item No": "2", "Part Name": "Oil Pump", "Quantity": 2, "Unit Price": 145.0, "Subtotal": 290.0, "Material": "Gear-type"},
+    ]
+    run_id = start_run(conn)
+    save_results(conn, run_id, [{"assembly": "a.png", "template": "engine", "items": items, "total": 815.0}])
+
+    source, new_run, n = reprice_store(conn, {"engine/Crankshaft": 600.0})
+
+    assert (source, n) == (run_id, 2)
+    assert sorted(iter_run_lines(conn, new_run)) == [
+        ("a.png", "1", "Crankshaft", 1, 600.0),
+        ("a.png", "2", "Oil Pump", 2, 145.0),
+    ]
+    # The original run keeps the prices it was recorded with
+    assert ("a.png", "1", "Crankshaft", 1, 525.0) in list(iter_run_lines(conn, run_id))
+    with pytest.raises(ValueError):
+        reprice_store(conn, {}, run_id=999)